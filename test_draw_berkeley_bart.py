@@ -3,6 +3,9 @@
 License: BSD
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import sketchingpy
@@ -26,6 +29,23 @@ class BerkeleyBartTests(unittest.TestCase):
         self.assertEqual(result.get_code(), 'te')
         self.assertEqual(result.get_count(), 1234)
 
+    def test_get_stations_cached(self):
+        data_facade = draw_berkeley_bart.DataFacade(self._sketch)
+        first = data_facade.get_stations('berkeley_trips.csv')
+        second = data_facade.get_stations('berkeley_trips.csv')
+        self.assertIs(first, second)
+
+    def test_get_stations_refresh(self):
+        data_facade = draw_berkeley_bart.DataFacade(self._sketch)
+        with tempfile.TemporaryDirectory() as working_dir:
+            loc = os.path.join(working_dir, 'berkeley_trips.csv')
+            shutil.copy('berkeley_trips.csv', loc)
+            first = data_facade.get_stations(loc)
+            os.utime(loc, (0, 0))
+            second = data_facade.get_stations(loc)
+        self.assertIsNot(first, second)
+        self.assertEqual(len(first), len(second))
+
     def test_get_line_length_zero(self):
         presenter = draw_berkeley_bart.StationVizPresenter(self._sketch)
         self.assertEqual(presenter._get_line_length(100, 0), draw_berkeley_bart.LINE_MIN_LEN)